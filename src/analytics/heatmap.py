@@ -1,4 +1,5 @@
 """Heatmap generation for traffic patterns"""
+import threading
 import numpy as np
 import cv2
 from typing import List, Dict, Any, Optional
@@ -9,44 +10,123 @@ from src.tracking.tracker import Track
 class HeatmapGenerator:
     """Generate foot traffic heatmaps"""
     
-    def __init__(self, resolution: Dict[str, int], decay: float = 0.995):
+    # Pending impulses are folded in on read, and at the latest once the
+    # deferred decay drops below this (about every 10 frames at 0.995)
+    FOLD_BELOW = 0.95
+    
+    def __init__(self, resolution: Dict[str, int], decay: float = 0.995, sigma: int = 30, scale: int = 4):
         self.width = resolution.get("width", 1280)
         self.height = resolution.get("height", 720)
         self.decay = decay
+        self.sigma = sigma
+        
+        # Heatmap is kept on a grid `scale` times coarser than the frame and
+        # upsampled for display; the blob blur hides the lost detail
+        self.scale = scale
+        grid_h = -(-self.height // scale)
+        grid_w = -(-self.width // scale)
+        
+        # Three box passes approximate a gaussian of the given sigma
+        grid_sigma = sigma / scale
+        self._box_size = int(np.sqrt(4 * grid_sigma ** 2 + 1)) | 1
+        self._splat_gain = self._compute_splat_gain()
+        
+        # Impulses splatted since the last read, blurred lazily into the
+        # heatmap on read. Decay is deferred: impulses are stored divided by
+        # the decay accumulated since that read, and the factor is applied
+        # once when they are folded in instead of per frame.
+        # The impulse and blur buffers carry a zero margin as wide as the
+        # three passes reach, so blobs at the frame edge are not cut short
+        m = 3 * (self._box_size // 2)
+        self._raw = np.zeros((grid_h + 2 * m, grid_w + 2 * m), dtype=np.float32)
+        self._blurred = np.empty_like(self._raw)
+        self._interior = (slice(m, m + grid_h), slice(m, m + grid_w))
+        self._margin = m
+        self._decay_scale = 1.0
+        self._pending = False
+        
+        # Heatmap as of the last read, clamped at 1.0
+        self._grid = np.zeros((grid_h, grid_w), dtype=np.float32)
         
-        # Heatmap accumulator
-        self.heatmap = np.zeros((self.height, self.width), dtype=np.float32)
+        # Reads run on executor threads while updates run on the event loop;
+        # the lock keeps the buffers and the decay factor consistent
+        self._lock = threading.Lock()
         
+    def _box_blur(self, src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+        """Blur with three box filter passes (converges to a gaussian)"""
+        ksize = (self._box_size, self._box_size)
+        cv2.boxFilter(src, -1, ksize, dst=dst, borderType=cv2.BORDER_CONSTANT)
+        cv2.boxFilter(dst, -1, ksize, dst=dst, borderType=cv2.BORDER_CONSTANT)
+        cv2.boxFilter(dst, -1, ksize, dst=dst, borderType=cv2.BORDER_CONSTANT)
+        return dst
+    
+    def _compute_splat_gain(self) -> float:
+        """Impulse value that makes each blurred blob peak at 1.0"""
+        size = 3 * self._box_size
+        probe = np.zeros((size, size), dtype=np.float32)
+        probe[size // 2, size // 2] = 1.0
+        return 1.0 / float(self._box_blur(probe, np.empty_like(probe)).max())
+    
     def update(self, tracks: List[Track]):
         """Update heatmap with current track positions"""
-        # Apply decay
-        self.heatmap *= self.decay
+        if tracks:
+            centers = np.array([track.center for track in tracks], dtype=np.int64)
+            cx, cy = centers[:, 0], centers[:, 1]
+            inside = (cx >= 0) & (cx < self.width) & (cy >= 0) & (cy < self.height)
+            m = self._margin
+            cells = (cy[inside] // self.scale + m, cx[inside] // self.scale + m)
         
-        # Add current positions
-        for track in tracks:
-            cx, cy = track.center
-            if 0 <= cx < self.width and 0 <= cy < self.height:
-                # Add gaussian blob at position
-                self._add_gaussian(cx, cy, sigma=30, intensity=1.0)
+        with self._lock:
+            # Apply decay to the scalar factor only
+            self._decay_scale *= self.decay
+            
+            # Clamping only happens when impulses are folded in, so do not let
+            # them pile up unclamped for long when nobody reads the heatmap
+            if self._decay_scale < self.FOLD_BELOW:
+                self._fold()
+            
+            if not tracks:
+                return
+            
+            # Accumulate impulses at track centers; blurring is deferred to read
+            np.add.at(self._raw, cells, self._splat_gain / self._decay_scale)
+            self._pending = True
     
-    def _add_gaussian(self, x: int, y: int, sigma: int = 30, intensity: float = 1.0):
-        """Add a gaussian blob to the heatmap"""
-        size = sigma * 3
-        x_min = max(0, x - size)
-        x_max = min(self.width, x + size)
-        y_min = max(0, y - size)
-        y_max = min(self.height, y + size)
+    def _fold(self):
+        """Blur pending impulses into the heatmap, decay it and clamp at 1.0
+        
+        Called with the lock held. Clamping the stored heatmap, rather than
+        only the image handed out, keeps a long stay from piling up far above
+        1.0, so the spot starts fading as soon as the person leaves.
+        """
+        if self._pending:
+            # Blur is linear, so blurring the summed impulses equals summing blobs
+            self._grid += self._box_blur(self._raw, self._blurred)[self._interior]
+            self._raw.fill(0)
+            self._pending = False
         
-        for py in range(y_min, y_max):
-            for px in range(x_min, x_max):
-                dist_sq = (px - x) ** 2 + (py - y) ** 2
-                value = intensity * np.exp(-dist_sq / (2 * sigma ** 2))
-                self.heatmap[py, px] = min(1.0, self.heatmap[py, px] + value)
+        self._grid *= self._decay_scale
+        np.minimum(self._grid, 1.0, out=self._grid)
+        self._decay_scale = 1.0
+    
+    def _render(self) -> np.ndarray:
+        """Return the current heatmap at frame resolution"""
+        with self._lock:
+            self._fold()
+            grid = self._grid.copy()
+        return cv2.resize(grid, (self.width, self.height), interpolation=cv2.INTER_LINEAR)
+    
+    @property
+    def heatmap(self) -> np.ndarray:
+        """Current heatmap on the coarse grid"""
+        with self._lock:
+            self._fold()
+            return self._grid.copy()
     
     def get_heatmap_image(self, background: Optional[np.ndarray] = None) -> np.ndarray:
         """Get heatmap as colored image"""
         # Normalize heatmap
-        normalized = (self.heatmap * 255).astype(np.uint8)
+        normalized = (self._render() * 255).astype(np.uint8)
         
         # Apply colormap
         colored = cv2.applyColorMap(normalized, cv2.COLORMAP_JET)
@@ -59,8 +139,12 @@ class HeatmapGenerator:
     
     def get_heatmap_data(self) -> np.ndarray:
         """Get raw heatmap data"""
-        return self.heatmap.copy()
+        return self._render()
     
     def reset(self):
         """Reset heatmap"""
-        self.heatmap = np.zeros((self.height, self.width), dtype=np.float32)
\ No newline at end of file
+        with self._lock:
+            self._raw.fill(0)
+            self._grid.fill(0)
+            self._decay_scale = 1.0
+            self._pending = False
@@ -23,6 +23,11 @@ class MetricsCollector:
         self.footfall_history: deque = deque(maxlen=3600)  # 1 hour of per-second data
         self.count_history: deque = deque(maxlen=3600)
         
+        # Rolling window for the average occupancy, kept with a running sum
+        self.avg_window = timedelta(minutes=5)
+        self._window_counts: deque = deque()
+        self._window_sum = 0.0
+        
         # Aggregated metrics
         self.total_footfall = 0
         self.peak_occupancy = 0
@@ -36,6 +41,9 @@ class MetricsCollector:
         now = datetime.now()
         
         self.count_history.append(TimeSeriesPoint(timestamp=now, value=count))
+        self._window_counts.append(TimeSeriesPoint(timestamp=now, value=count))
+        self._window_sum += count
+        self._evict_window(now)
         
         if count > self.peak_occupancy:
             self.peak_occupancy = count
@@ -49,13 +57,18 @@ class MetricsCollector:
         self.footfall_history.append(TimeSeriesPoint(timestamp=now, value=count))
         self.hourly_footfall[now.hour] += count
     
+    def _evict_window(self, now: datetime):
+        """Drop counts that fell out of the rolling average window"""
+        while self._window_counts and now - self._window_counts[0].timestamp >= self.avg_window:
+            self._window_sum -= self._window_counts.popleft().value
+    
     def get_summary(self) -> Dict[str, Any]:
         """Get metrics summary"""
-        now = datetime.now()
+        self._evict_window(datetime.now())
         
         # Calculate averages
-        recent_counts = [p.value for p in self.count_history if now - p.timestamp < timedelta(minutes=5)]
-        avg_occupancy = sum(recent_counts) / len(recent_counts) if recent_counts else 0
+        n = len(self._window_counts)
+        avg_occupancy = self._window_sum / n if n else 0
         
         return {
             "total_footfall": self.total_footfall,
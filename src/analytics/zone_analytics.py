@@ -1,11 +1,12 @@
 """Zone-based analytics"""
 import time
+import numpy as np
 from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass, field
 from collections import defaultdict
 
 from src.tracking.tracker import Track
-from src.utils.helpers import point_in_polygon
+from src.utils.helpers import PolygonSet
 from src.utils.logger import logger
 
 
@@ -38,27 +39,36 @@ class ZoneAnalytics:
             for zone in zones_config
         }
         
+        self._zone_names = [zone["name"] for zone in zones_config]
+        self._zone_polygons = PolygonSet([zone["points"] for zone in zones_config])
+        
         # Track which zone each track was last in
         self.track_zones: Dict[int, Optional[TrackZoneInfo]] = {}
         
+        # Zone of each track as of the latest update
+        self.last_zone_by_track: Dict[int, Optional[str]] = {}
+        
     def update(self, tracks: List[Track]):
         """Update zone analytics with current tracks"""
         current_time = time.time()
         current_track_ids = set()
         
-        # Reset current counts
-        for stats in self.zone_stats.values():
-            stats.current_count = 0
+        zone_ids = self._classify_points([track.center for track in tracks])
+        track_zones = self._zone_names_for(zone_ids)
+        self.last_zone_by_track = {
+            track.track_id: zone for track, zone in zip(tracks, track_zones)
+        }
+        
+        # Current counts per zone (last bin holds tracks outside all zones)
+        counts = np.bincount(zone_ids, minlength=len(self._zone_names) + 1)
+        for name, count in zip(self._zone_names, counts.tolist()):
+            self.zone_stats[name].current_count = count
         
-        for track in tracks:
+        for track, current_zone in zip(tracks, track_zones):
             current_track_ids.add(track.track_id)
-            current_zone = self.get_zone_for_point(track.center)
             previous_zone_info = self.track_zones.get(track.track_id)
             
             if current_zone:
-                # Increment current count
-                self.zone_stats[current_zone].current_count += 1
-                
                 # Check if this is a new entry
                 if previous_zone_info is None or previous_zone_info.zone_name != current_zone:
                     # Exiting previous zone
@@ -103,10 +113,27 @@ class ZoneAnalytics:
     
     def get_zone_for_point(self, point: Tuple[int, int]) -> Optional[str]:
         """Get which zone a point is in"""
-        for zone in self.zones:
-            if point_in_polygon(point, zone["points"]):
-                return zone["name"]
-        return None
+        return self.get_zones_for_points([point])[0]
+    
+    def _classify_points(self, points: List[Tuple[int, int]]) -> np.ndarray:
+        """Zone index per point, or len(zones) if the point is in no zone"""
+        n_zones = len(self._zone_names)
+        if not points or n_zones == 0:
+            return np.full(len(points), n_zones, dtype=np.intp)
+        
+        inside = self._zone_polygons.contains(points)
+        
+        # First matching zone in config order wins
+        return np.where(inside.any(axis=1), inside.argmax(axis=1), n_zones)
+    
+    def _zone_names_for(self, zone_ids: np.ndarray) -> List[Optional[str]]:
+        """Map zone indices from _classify_points to zone names"""
+        n_zones = len(self._zone_names)
+        return [self._zone_names[z] if z < n_zones else None for z in zone_ids.tolist()]
+    
+    def get_zones_for_points(self, points: List[Tuple[int, int]]) -> List[Optional[str]]:
+        """Get which zone each point is in, testing all points at once"""
+        return self._zone_names_for(self._classify_points(points))
     
     def get_stats(self) -> Dict[str, Dict[str, Any]]:
         """Get all zone statistics"""
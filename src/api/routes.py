@@ -1,5 +1,7 @@
 """FastAPI routes for the analytics API"""
 import asyncio
+import json
+import time
 from typing import Dict, Any, Optional
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.responses import JSONResponse
@@ -13,6 +15,10 @@ _camera_manager = None
 _metrics_collector = None
 _config = None
 
+# Serialized analytics payload shared by all analytics WebSocket clients
+_analytics_cache: Dict[str, Any] = {"ts": 0.0, "payload": None}
+ANALYTICS_INTERVAL = 1.0
+
 
 def set_dependencies(camera_manager, metrics_collector, config):
     """Set module dependencies"""
@@ -77,7 +83,7 @@ async def get_camera_frame(camera_id: str):
     if not processor:
         raise HTTPException(status_code=404, detail="Camera not found")
     
-    frame_base64 = processor.get_frame_base64()
+    frame_base64 = await processor.get_frame_base64_async()
     if not frame_base64:
         raise HTTPException(status_code=404, detail="No frame available")
     
@@ -94,7 +100,7 @@ async def get_camera_heatmap(camera_id: str):
     if not processor:
         raise HTTPException(status_code=404, detail="Camera not found")
     
-    heatmap_base64 = processor.get_heatmap_base64()
+    heatmap_base64 = await processor.get_heatmap_base64_async()
     if not heatmap_base64:
         raise HTTPException(status_code=404, detail="No heatmap available")
     
@@ -128,7 +134,11 @@ async def get_all_zones():
 
 @router.websocket("/ws/stream/{camera_id}")
 async def websocket_stream(websocket: WebSocket, camera_id: str):
-    """WebSocket endpoint for real-time video stream"""
+    """WebSocket endpoint for real-time video stream
+    
+    Each tick sends a JSON "stats" message followed by the frame as a
+    binary JPEG message.
+    """
     await websocket.accept()
     
     if _camera_manager is None:
@@ -145,16 +155,16 @@ async def websocket_stream(websocket: WebSocket, camera_id: str):
     try:
         while True:
             # Get latest frame and analytics
-            frame_base64 = processor.get_frame_base64()
+            frame_jpeg = await processor.get_frame_jpeg_bytes_async()
             
-            if frame_base64:
+            if frame_jpeg:
                 await websocket.send_json({
-                    "type": "frame",
+                    "type": "stats",
                     "camera_id": camera_id,
-                    "frame": frame_base64,
                     "current_count": processor.current_count,
                     "zone_stats": processor.zone_analytics.get_stats()
                 })
+                await websocket.send_bytes(frame_jpeg)
             
             await asyncio.sleep(0.1)  # 10 FPS for WebSocket
             
@@ -164,6 +174,21 @@ async def websocket_stream(websocket: WebSocket, camera_id: str):
         logger.error(f"WebSocket error: {e}")
 
 
+def _get_analytics_payload() -> str:
+    """Build and serialize the analytics payload at most once per interval"""
+    now = time.monotonic()
+    
+    if _analytics_cache["payload"] is None or now - _analytics_cache["ts"] >= ANALYTICS_INTERVAL:
+        _analytics_cache["payload"] = json.dumps({
+            "type": "analytics",
+            "cameras": _camera_manager.get_all_stats(),
+            "summary": _metrics_collector.get_summary() if _metrics_collector else {}
+        })
+        _analytics_cache["ts"] = now
+    
+    return _analytics_cache["payload"]
+
+
 @router.websocket("/ws/analytics")
 async def websocket_analytics(websocket: WebSocket):
     """WebSocket endpoint for real-time analytics updates"""
@@ -177,14 +202,10 @@ async def websocket_analytics(websocket: WebSocket):
     
     try:
         while True:
-            # Send aggregated analytics
-            await websocket.send_json({
-                "type": "analytics",
-                "cameras": _camera_manager.get_all_stats(),
-                "summary": _metrics_collector.get_summary() if _metrics_collector else {}
-            })
+            # Send aggregated analytics (shared across clients)
+            await websocket.send_text(_get_analytics_payload())
             
-            await asyncio.sleep(1)  # 1 update per second
+            await asyncio.sleep(ANALYTICS_INTERVAL)  # 1 update per second
             
     except WebSocketDisconnect:
         logger.info("Analytics WebSocket disconnected")
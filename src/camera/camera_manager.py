@@ -2,55 +2,86 @@
 import asyncio
 import cv2
 import numpy as np
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 import base64
 
 from src.camera.video_stream import VideoStream
-from src.detection.person_detector import PersonDetector
+from src.detection.person_detector import PersonDetector, Detection
 from src.tracking.tracker import MultiObjectTracker
 from src.analytics.zone_analytics import ZoneAnalytics
 from src.analytics.heatmap import HeatmapGenerator
 from src.utils.logger import logger
 
+JPEG_PARAMS = [int(cv2.IMWRITE_JPEG_QUALITY), 75]
+
 
 class CameraProcessor:
     """Process frames from a single camera"""
     
-    def __init__(self, camera_config: Dict[str, Any], detection_config: Dict[str, Any], tracking_config: Dict[str, Any]):
+    def __init__(self, camera_config: Dict[str, Any], detector: PersonDetector,
+                 tracking_config: Dict[str, Any], detect_every_n_frames: int = 1):
         self.config = camera_config
         self.camera_id = camera_config["id"]
+        self.detect_every_n_frames = max(1, detect_every_n_frames)
+        self._frames_seen = 0
         self.stream = VideoStream(camera_config)
-        self.detector = PersonDetector(detection_config)
+        self.detector = detector
         self.tracker = MultiObjectTracker(tracking_config)
         self.zone_analytics = ZoneAnalytics(camera_config.get("zones", []))
         self.heatmap = HeatmapGenerator(
             camera_config.get("resolution", {"width": 1280, "height": 720})
         )
         
+        # Zone outlines and label positions for drawing, fixed per camera
+        zones = camera_config.get("zones", [])
+        self._zone_names = [zone["name"] for zone in zones]
+        self._zone_pts = [np.asarray(zone["points"], np.int32) for zone in zones]
+        self._zone_centroids = [tuple(np.mean(p, axis=0).astype(int).tolist()) for p in self._zone_pts]
+        
         self.current_count = 0
         self.total_footfall = 0
         self.processed_frames = 0
         self.last_processed_frame: Optional[np.ndarray] = None
         
+        # Encoded images with the processed_frames count they were made at.
+        # Encoding runs on worker threads, so each cache is one (count, data)
+        # tuple that is replaced whole and never seen half-updated
+        self._frame_jpeg_cache: Tuple[int, Optional[bytes]] = (-1, None)
+        self._frame_base64_cache: Tuple[int, Optional[str]] = (-1, None)
+        self._heatmap_cache: Tuple[int, Optional[str]] = (-1, None)
+        
     def start(self) -> bool:
         return self.stream.start()
     
     def stop(self):
         self.stream.stop()
     
-    async def process_frame(self) -> Dict[str, Any]:
-        """Process a single frame and return analytics"""
-        ret, frame = await self.stream.read_async()
-        
-        if not ret or frame is None:
-            return {"error": "No frame available"}
-        
-        # Detect persons
-        detections = self.detector.detect(frame)
+    def read_frame(self) -> Optional[np.ndarray]:
+        """Take the latest frame from the stream (non-blocking)"""
+        ret, frame = self.stream.read()
+        return frame if ret else None
+    
+    @property
+    def detects_next_frame(self) -> bool:
+        """Whether the next frame goes through the detector (every n-th frame)"""
+        return self._frames_seen % self.detect_every_n_frames == 0
+    
+    def advance_frame(self):
+        """Count a frame taken from the stream towards the detection schedule"""
+        self._frames_seen += 1
+    
+    async def postprocess(self, frame: np.ndarray, detections: Optional[List[Detection]]) -> Dict[str, Any]:
+        """Run tracking and analytics on a frame's detections
         
+        ``detections`` is None for frames that skipped the detector; tracks
+        are then extrapolated from their velocities.
+        """
         # Update tracker
-        tracks = self.tracker.update(detections)
+        if detections is None:
+            tracks = self.tracker.predict_only()
+        else:
+            tracks = self.tracker.update(detections)
         
         # Update analytics
         self.zone_analytics.update(tracks)
@@ -73,7 +104,7 @@ class CameraProcessor:
                     "id": t.track_id,
                     "bbox": t.bbox.tolist(),
                     "center": t.center,
-                    "zone": self.zone_analytics.get_zone_for_point(t.center)
+                    "zone": self.zone_analytics.last_zone_by_track.get(t.track_id)
                 }
                 for t in tracks
             ],
@@ -82,34 +113,36 @@ class CameraProcessor:
         }
     
     def _draw_annotations(self, frame: np.ndarray, tracks: List) -> np.ndarray:
-        """Draw bounding boxes, tracks, and zones on frame"""
-        annotated = frame.copy()
+        """Draw bounding boxes, tracks, and zones on frame (in place)"""
+        annotated = frame
         
         # Draw zones
-        for zone in self.config.get("zones", []):
-            points = np.array(zone["points"], np.int32)
-            cv2.polylines(annotated, [points], True, (0, 255, 255), 2)
-            
+        cv2.polylines(annotated, self._zone_pts, True, (0, 255, 255), 2)
+        for name, centroid in zip(self._zone_names, self._zone_centroids):
             # Zone label
-            centroid = np.mean(points, axis=0).astype(int)
-            cv2.putText(annotated, zone["name"], tuple(centroid), 
+            cv2.putText(annotated, name, centroid, 
                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
         
         # Draw tracks
+        track_zones = self.zone_analytics.last_zone_by_track
         for track in tracks:
             x1, y1, x2, y2 = map(int, track.bbox)
             
             # Bounding box
             cv2.rectangle(annotated, (x1, y1), (x2, y2), (0, 255, 0), 2)
             
-            # Track ID
-            cv2.putText(annotated, f"ID: {track.track_id}", (x1, y1 - 10),
+            # Track ID, with the zone assigned during the zone analytics update
+            label = f"ID: {track.track_id}"
+            zone = track_zones.get(track.track_id)
+            if zone:
+                label = f"{label} | {zone}"
+            cv2.putText(annotated, label, (x1, y1 - 10),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
             
             # Trail
             if len(track.trail) > 1:
-                for i in range(1, len(track.trail)):
-                    cv2.line(annotated, track.trail[i-1], track.trail[i], (255, 0, 0), 2)
+                trail = np.array(track.trail, dtype=np.int32)
+                cv2.polylines(annotated, [trail], False, (255, 0, 0), 2)
         
         # Stats overlay
         cv2.putText(annotated, f"Count: {self.current_count}", (10, 30),
@@ -119,41 +152,105 @@ class CameraProcessor:
         
         return annotated
     
+    def get_frame_jpeg_bytes(self) -> Optional[bytes]:
+        """Get latest processed frame as raw JPEG bytes (encoded once per frame)"""
+        return self._encode_frame()[1]
+    
+    def _encode_frame(self) -> Tuple[int, Optional[bytes]]:
+        """JPEG of the latest processed frame, with the count it is cached under"""
+        # postprocess publishes the frame before bumping the count, so reading
+        # the count first means the frame is never older than its label
+        frame_id = self.processed_frames
+        frame = self.last_processed_frame
+        if frame is None:
+            return frame_id, None
+        
+        cache = self._frame_jpeg_cache
+        if cache[0] != frame_id:
+            _, buffer = cv2.imencode('.jpg', frame, JPEG_PARAMS)
+            cache = self._frame_jpeg_cache = (frame_id, buffer.tobytes())
+        return cache
+    
     def get_frame_base64(self) -> Optional[str]:
         """Get latest processed frame as base64"""
-        if self.last_processed_frame is None:
+        frame_id, jpeg = self._encode_frame()
+        if jpeg is None:
             return None
         
-        _, buffer = cv2.imencode('.jpg', self.last_processed_frame)
-        return base64.b64encode(buffer).decode('utf-8')
+        cache = self._frame_base64_cache
+        if cache[0] != frame_id:
+            cache = self._frame_base64_cache = (frame_id, base64.b64encode(jpeg).decode('utf-8'))
+        return cache[1]
+    
+    async def get_frame_jpeg_bytes_async(self) -> Optional[bytes]:
+        """Async JPEG bytes; encoding runs in a worker thread"""
+        return await asyncio.get_event_loop().run_in_executor(None, self.get_frame_jpeg_bytes)
+    
+    async def get_frame_base64_async(self) -> Optional[str]:
+        """Async base64 frame; encoding runs in a worker thread"""
+        return await asyncio.get_event_loop().run_in_executor(None, self.get_frame_base64)
+    
+    async def get_heatmap_base64_async(self) -> Optional[str]:
+        """Async base64 heatmap; blur and encoding run in a worker thread"""
+        return await asyncio.get_event_loop().run_in_executor(None, self.get_heatmap_base64)
     
     def get_heatmap_base64(self) -> Optional[str]:
-        """Get heatmap as base64"""
+        """Get heatmap as base64 (encoded once per frame)"""
+        # The heatmap is updated before the count is bumped, so reading the
+        # count first means the image is never older than its label
+        heatmap_id = self.processed_frames
+        cache = self._heatmap_cache
+        if cache[0] == heatmap_id:
+            return cache[1]
+        
         heatmap_img = self.heatmap.get_heatmap_image()
         if heatmap_img is None:
             return None
         
-        _, buffer = cv2.imencode('.jpg', heatmap_img)
-        return base64.b64encode(buffer).decode('utf-8')
+        _, buffer = cv2.imencode('.jpg', heatmap_img, JPEG_PARAMS)
+        encoded = base64.b64encode(buffer).decode('utf-8')
+        self._heatmap_cache = (heatmap_id, encoded)
+        return encoded
 
 
 class CameraManager:
-    """Manage multiple camera processors"""
+    """Manage multiple camera processors
+    
+    Frames flow through a pipeline of asyncio tasks connected by bounded
+    queues: one capture task per camera, one inference task batching across
+    cameras, and one post-processing task per camera. When a stage falls
+    behind, the oldest queued item is dropped so the pipeline never stalls;
+    frames that skipped the detector give way to detection results.
+    """
+    
+    DEFAULT_BUFFER_LEN = 2
     
     def __init__(self, config: Dict[str, Any]):
         self.config = config
+        self.buffer_len = max(1, config.get("pipeline", {}).get("buffer_len", self.DEFAULT_BUFFER_LEN))
         self.processors: Dict[str, CameraProcessor] = {}
         self.running = False
-        self._process_task: Optional[asyncio.Task] = None
+        self._tasks: List[asyncio.Task] = []
+        
+        # One detector shared by all cameras so the model is loaded once; by
+        # default it batches one frame per camera
+        detection_config = dict(config.get("detection", {}))
+        detection_config.setdefault("max_batch", max(1, len(config.get("cameras", []))))
+        self.detector = PersonDetector(detection_config)
         
         # Initialize processors for each camera
         for cam_config in config.get("cameras", []):
             processor = CameraProcessor(
                 cam_config,
-                config.get("detection", {}),
-                config.get("tracking", {})
+                self.detector,
+                config.get("tracking", {}),
+                detection_config.get("detect_every_n_frames", 1)
             )
             self.processors[cam_config["id"]] = processor
+        
+        # Per-camera stage queues: captured frames, and frames with detections
+        self._frame_queues: Dict[str, asyncio.Queue] = {}
+        self._result_queues: Dict[str, asyncio.Queue] = {}
     
     async def start(self):
         """Start all camera processors"""
@@ -164,37 +261,127 @@ class CameraManager:
                 logger.info(f"Started processor for camera {camera_id}")
             else:
                 logger.error(f"Failed to start processor for camera {camera_id}")
+            
+            self._frame_queues[camera_id] = asyncio.Queue(maxsize=self.buffer_len)
+            self._result_queues[camera_id] = asyncio.Queue(maxsize=self.buffer_len)
         
-        # Start processing loop
-        self._process_task = asyncio.create_task(self._processing_loop())
+        # Start pipeline stages
+        for camera_id, processor in self.processors.items():
+            self._tasks.append(asyncio.create_task(self._capture_loop(camera_id, processor)))
+            self._tasks.append(asyncio.create_task(self._postprocess_loop(camera_id, processor)))
+        self._tasks.append(asyncio.create_task(self._inference_loop()))
     
     async def stop(self):
         """Stop all camera processors"""
         self.running = False
         
-        if self._process_task:
-            self._process_task.cancel()
-            try:
-                await self._process_task
-            except asyncio.CancelledError:
-                pass
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
         
         for processor in self.processors.values():
             processor.stop()
     
-    async def _processing_loop(self):
-        """Main processing loop for all cameras"""
+    @staticmethod
+    def _put_latest(queue: asyncio.Queue, item: Any):
+        """Enqueue without blocking, dropping the oldest item when full"""
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(item)
+    
+    @staticmethod
+    def _put_result(queue: asyncio.Queue, item: Tuple[np.ndarray, Optional[List[Detection]]]):
+        """Enqueue a frame for post-processing without blocking
+        
+        A skipped frame (no detections) is only queued if there is room. A
+        detection result is never dropped to make room for one: when the
+        queue is full it evicts the oldest skipped frame, or failing that
+        the oldest result.
+        """
+        if not queue.full():
+            queue.put_nowait(item)
+            return
+        
+        if item[1] is None:
+            return
+        
+        pending = [queue.get_nowait() for _ in range(queue.qsize())]
+        evict = next((i for i, (_, detections) in enumerate(pending) if detections is None), 0)
+        del pending[evict]
+        pending.append(item)
+        for queued in pending:
+            queue.put_nowait(queued)
+    
+    @staticmethod
+    def _take_latest(queue: asyncio.Queue) -> Any:
+        """Drain a queue and return its newest item, or None if empty"""
+        item = None
+        while not queue.empty():
+            item = queue.get_nowait()
+        return item
+    
+    async def _capture_loop(self, camera_id: str, processor: CameraProcessor):
+        """Capture stage: move new frames from the stream into the frame queue"""
+        queue = self._frame_queues[camera_id]
+        
+        while self.running:
+            # Streams have no restart logic, so one that failed to start or
+            # has stopped will not produce frames again
+            if not processor.stream.is_running:
+                logger.warning(f"Camera {camera_id} is not running; stopping its capture stage")
+                return
+            
+            # The stream read is a non-blocking slot pop, so it runs inline
+            frame = processor.read_frame()
+            
+            if frame is None:
+                await asyncio.sleep(0.005)
+                continue
+            
+            self._put_latest(queue, frame)
+    
+    async def _inference_loop(self):
+        """Inference stage: detect on the latest frame of every camera in one batch"""
         while self.running:
-            tasks = [
-                processor.process_frame()
-                for processor in self.processors.values()
-                if processor.stream.is_running
-            ]
+            batch = []
+            for camera_id, queue in self._frame_queues.items():
+                frame = self._take_latest(queue)
+                if frame is None:
+                    continue
+                
+                processor = self.processors[camera_id]
+                detect = processor.detects_next_frame
+                processor.advance_frame()
+                if detect:
+                    batch.append((camera_id, frame))
+                else:
+                    # Skipped frame: tracks are extrapolated in post-processing
+                    self._put_result(self._result_queues[camera_id], (frame, None))
+            
+            if not batch:
+                await asyncio.sleep(0.005)
+                continue
             
-            if tasks:
-                await asyncio.gather(*tasks, return_exceptions=True)
+            # Run the model off the event loop so capture and the API keep going
+            all_detections = await self.detector.detect_batch_async(
+                [frame for _, frame in batch]
+            )
             
-            await asyncio.sleep(0.033)  # ~30 FPS
+            for (camera_id, frame), detections in zip(batch, all_detections):
+                self._put_result(self._result_queues[camera_id], (frame, detections))
+    
+    async def _postprocess_loop(self, camera_id: str, processor: CameraProcessor):
+        """Post-processing stage: tracking, analytics and annotation per camera"""
+        queue = self._result_queues[camera_id]
+        
+        while self.running:
+            frame, detections = await queue.get()
+            
+            try:
+                await processor.postprocess(frame, detections)
+            except Exception as e:
+                logger.error("Processing error on camera {}: {}", camera_id, e)
     
     def get_processor(self, camera_id: str) -> Optional[CameraProcessor]:
         """Get processor for a specific camera"""
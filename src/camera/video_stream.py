@@ -1,10 +1,9 @@
 """Video stream handling"""
 import cv2
-import asyncio
 import numpy as np
 from typing import Optional, Tuple, Dict, Any
-from threading import Thread, Lock
-from queue import Queue
+from threading import Thread
+from collections import deque
 from src.utils.logger import logger
 
 
@@ -17,19 +16,21 @@ class VideoStream:
         self.name = camera_config["name"]
         self.target_fps = camera_config.get("fps", 30)
         self.resolution = camera_config.get("resolution", {"width": 1280, "height": 720})
+        self.hw_accel = camera_config.get("hw_accel", True)
         
         self.cap: Optional[cv2.VideoCapture] = None
-        self.frame_queue: Queue = Queue(maxsize=10)
         self.running = False
         self.thread: Optional[Thread] = None
-        self.lock = Lock()
         self.frame_count = 0
-        self.current_frame: Optional[np.ndarray] = None
+        
+        # Single latest-frame slot; deque append/popleft are atomic, so the
+        # capture thread and readers hand frames over without a lock
+        self._latest: deque = deque(maxlen=1)
         
     def start(self) -> bool:
         """Start the video stream"""
         try:
-            self.cap = cv2.VideoCapture(self.source)
+            self.cap = self._open_capture()
             
             if not self.cap.isOpened():
                 logger.error(f"Failed to open camera {self.camera_id}: {self.source}")
@@ -40,6 +41,9 @@ class VideoStream:
             self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.resolution["height"])
             self.cap.set(cv2.CAP_PROP_FPS, self.target_fps)
             
+            # Keep only the newest frame in the driver buffer to avoid lag
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            
             self.running = True
             self.thread = Thread(target=self._capture_loop, daemon=True)
             self.thread.start()
@@ -51,41 +55,46 @@ class VideoStream:
             logger.error(f"Error starting camera {self.camera_id}: {e}")
             return False
     
+    def _open_capture(self) -> cv2.VideoCapture:
+        """Open the source, using FFmpeg with hardware decoding for streams/files"""
+        if isinstance(self.source, str) and self.hw_accel:
+            cap = cv2.VideoCapture(
+                self.source,
+                cv2.CAP_FFMPEG,
+                [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
+            )
+            if cap.isOpened():
+                return cap
+            
+            logger.warning(f"Hardware decoding unavailable for camera {self.camera_id}, using default backend")
+            cap.release()
+        
+        return cv2.VideoCapture(self.source)
+    
     def _capture_loop(self):
         """Continuous frame capture loop"""
         while self.running:
             if self.cap is None:
                 break
                 
+            # cap.read() allocates a fresh array per frame, so frames handed
+            # out by read() are never written to again by this thread
             ret, frame = self.cap.read()
             
             if not ret:
-                logger.warning(f"Failed to read frame from camera {self.camera_id}")
+                logger.warning("Failed to read frame from camera {}", self.camera_id)
                 continue
             
-            with self.lock:
-                self.current_frame = frame
-                self.frame_count += 1
-            
-            # Clear old frames if queue is full
-            if self.frame_queue.full():
-                try:
-                    self.frame_queue.get_nowait()
-                except:
-                    pass
-            
-            self.frame_queue.put(frame)
+            # Replaces any frame that was not picked up in time
+            self._latest.append(frame)
+            self.frame_count += 1
     
     def read(self) -> Tuple[bool, Optional[np.ndarray]]:
-        """Read the latest frame"""
-        with self.lock:
-            if self.current_frame is None:
-                return False, None
-            return True, self.current_frame.copy()
-    
-    async def read_async(self) -> Tuple[bool, Optional[np.ndarray]]:
-        """Async frame read"""
-        return await asyncio.get_event_loop().run_in_executor(None, self.read)
+        """Take the latest frame without copying; the caller owns it afterwards"""
+        try:
+            return True, self._latest.popleft()
+        except IndexError:
+            return False, None
     
     def stop(self):
         """Stop the video stream"""
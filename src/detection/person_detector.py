@@ -1,10 +1,19 @@
 """Person detection using YOLOv8"""
+import asyncio
+import contextlib
+import cv2
 import numpy as np
-from typing import List, Dict, Any, Optional
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 
 try:
+    import torch
     from ultralytics import YOLO
+    try:
+        from ultralytics.utils.nms import non_max_suppression
+    except ImportError:  # Older releases keep NMS in ops
+        from ultralytics.utils.ops import non_max_suppression
     YOLO_AVAILABLE = True
 except ImportError:
     YOLO_AVAILABLE = False
@@ -12,7 +21,7 @@ except ImportError:
 from src.utils.logger import logger
 
 
-@dataclass
+@dataclass(slots=True)
 class Detection:
     """Detection result"""
     bbox: np.ndarray  # [x1, y1, x2, y2]
@@ -30,13 +39,56 @@ class Detection:
 class PersonDetector:
     """YOLOv8-based person detector"""
     
+    INPUT_SIZE = 640  # Square letterboxed input, matching the exported engine
+    PAD_VALUE = 114
+    NMS_IOU_THRESHOLD = 0.7  # Ultralytics' default for predict()
+    
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.confidence_threshold = config.get("confidence_threshold", 0.5)
         self.target_classes = config.get("classes", [0])  # 0 = person
+        self._target_classes_arr = np.asarray(self.target_classes)
+        self.use_tensorrt = config.get("tensorrt", False)
+        self.direct_inference = config.get("direct_inference", False)
+        self.max_batch = max(1, config.get("max_batch", 1))
+        self.model_name = config.get("model", "yolov8n")
+        self.precision = self._select_precision(config.get("precision", "auto"))
+        self.half = self.precision == "fp16"
         self.model: Optional[Any] = None
+        self._backend: Optional[Any] = None
+        self._rng = np.random.default_rng()
+        
+        # Dedicated CUDA stream so inference does not serialize with other
+        # work queued on the default stream
+        self._stream = (
+            torch.cuda.Stream() if YOLO_AVAILABLE and torch.cuda.is_available() else None
+        )
+        
+        # Page-locked staging buffer for letterboxed frames, its device
+        # counterpart (so uploads are asynchronous DMA copies), and the model
+        # input tensor, all allocated once
+        self._host_input = None
+        self._device_input = None
+        self._model_input = None
+        if self._stream is not None:
+            shape = (self.max_batch, self.INPUT_SIZE, self.INPUT_SIZE, 3)
+            self._host_input = torch.empty(shape, dtype=torch.uint8, pin_memory=True)
+            self._device_input = torch.empty(shape, dtype=torch.uint8, device="cuda")
+            self._model_input = torch.empty(
+                (self.max_batch, 3, self.INPUT_SIZE, self.INPUT_SIZE),
+                dtype=torch.float16 if self.half else torch.float32,
+                device="cuda"
+            )
         
-        self._load_model(config.get("model", "yolov8n"))
+        self._load_model(self.model_name)
+    
+    def _select_precision(self, precision: str) -> str:
+        """Resolve the configured precision; FP16 gives nothing on the nano model"""
+        if precision == "auto":
+            return "fp32" if self.model_name == "yolov8n" else "fp16"
+        if precision not in ("fp16", "fp32"):
+            raise ValueError(f"Unsupported precision: {precision}")
+        return precision
     
     def _load_model(self, model_name: str):
         """Load YOLO model"""
@@ -45,58 +97,233 @@ class PersonDetector:
             return
         
         try:
-            self.model = YOLO(f"{model_name}.pt")
-            logger.info(f"Loaded YOLO model: {model_name}")
+            if self.use_tensorrt and torch.cuda.is_available():
+                self.model = self._load_engine(model_name)
+            
+            if self.model is None:
+                self.model = YOLO(f"{model_name}.pt")
+                logger.info(f"Loaded YOLO model: {model_name}")
+            
+            if self._stream is not None and self.direct_inference:
+                self._backend = self._load_backend()
         except Exception as e:
             logger.error(f"Failed to load YOLO model: {e}")
             self.model = None
     
+    def _load_backend(self) -> Optional[Any]:
+        """Warm the model up and return the network behind its predictor
+        
+        Calling the network directly skips the high-level predict() path,
+        which checks tensor input with a synchronizing max() and copies the
+        whole input batch back to the host to attach to each result.
+        """
+        try:
+            frame = np.full((self.INPUT_SIZE, self.INPUT_SIZE, 3), self.PAD_VALUE, dtype=np.uint8)
+            self.model(frame, half=self.half, verbose=False)
+            return self.model.predictor.model
+        except Exception as e:
+            logger.warning(f"Direct model inference unavailable, using predict(): {e}")
+            return None
+    
+    def _load_engine(self, model_name: str) -> Optional[Any]:
+        """Load a TensorRT engine, exporting it once if not cached on disk
+        
+        The cache key covers every export setting that the engine is built
+        for; an engine for a smaller batch would reject larger batches.
+        """
+        engine_path = Path(
+            f"{model_name}-{self.precision}-b{self.max_batch}-{self.INPUT_SIZE}.engine"
+        )
+        
+        try:
+            if not engine_path.exists():
+                logger.info(f"Exporting {model_name} to TensorRT {self.precision} engine (one-time)")
+                exported = YOLO(f"{model_name}.pt").export(
+                    format="engine",
+                    half=self.half,
+                    simplify=True,
+                    imgsz=self.INPUT_SIZE,
+                    device=0,
+                    dynamic=True,
+                    batch=self.max_batch
+                )
+                Path(exported).rename(engine_path)
+            
+            model = YOLO(str(engine_path), task="detect")
+            logger.info(f"Loaded TensorRT engine: {engine_path}")
+            return model
+        except Exception as e:
+            logger.warning(f"TensorRT engine unavailable, using PyTorch model: {e}")
+            return None
+    
     def detect(self, frame: np.ndarray) -> List[Detection]:
         """Detect persons in frame"""
+        return self.detect_batch([frame])[0]
+    
+    async def detect_batch_async(self, frames: List[np.ndarray]) -> List[List[Detection]]:
+        """Run detect_batch in a worker thread so the event loop keeps running"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.detect_batch, frames)
+    
+    def detect_batch(self, frames: List[np.ndarray]) -> List[List[Detection]]:
+        """Detect persons in several frames with a single model call"""
+        if not frames:
+            return []
+        
         if self.model is None:
-            return self._dummy_detect(frame)
+            return [self._dummy_detect(frame) for frame in frames]
         
         try:
-            results = self.model(frame, verbose=False)[0]
+            # Never exceed the batch size the engine was built for
             detections = []
-            
-            for box in results.boxes:
-                class_id = int(box.cls[0])
-                confidence = float(box.conf[0])
+            for i in range(0, len(frames), self.max_batch):
+                chunk = frames[i:i + self.max_batch]
+                if self._backend is not None:
+                    try:
+                        detections.extend(self._detect_direct(chunk))
+                        continue
+                    except Exception as e:
+                        # The direct path relies on Ultralytics internals; switch
+                        # to predict() for good rather than fail every batch
+                        logger.warning(f"Direct inference failed, using predict() from now on: {e}")
+                        self._backend = None
                 
-                if class_id in self.target_classes and confidence >= self.confidence_threshold:
-                    bbox = box.xyxy[0].cpu().numpy()
-                    detections.append(Detection(
-                        bbox=bbox,
-                        confidence=confidence,
-                        class_id=class_id
-                    ))
-            
+                detections.extend(self._detect_predict(chunk))
             return detections
             
         except Exception as e:
-            logger.error(f"Detection error: {e}")
-            return []
+            logger.error("Detection error: {}", e)
+            return [[] for _ in frames]
+    
+    def _detect_predict(self, frames: List[np.ndarray]) -> List[List[Detection]]:
+        """Detect through the high-level YOLO call"""
+        with self._stream_context():
+            if self._host_input is None:
+                inputs, transforms = frames, [None] * len(frames)
+            else:
+                inputs, transforms = self._upload(frames)
+            results = self.model(inputs, half=self.half, verbose=False)
+        if self._stream is not None:
+            self._stream.synchronize()
+        return [
+            self._parse_result(result, transform)
+            for result, transform in zip(results, transforms)
+        ]
+    
+    def _detect_direct(self, frames: List[np.ndarray]) -> List[List[Detection]]:
+        """Detect by running the network and NMS on the uploaded batch"""
+        # Heads that already suppress duplicates only need filtering;
+        # older releases have no end2end option at all
+        nms_options = {"end2end": True} if getattr(self._backend, "end2end", False) else {}
+        
+        with self._stream_context():
+            inputs, transforms = self._upload(frames)
+            outputs = non_max_suppression(
+                self._backend(inputs),
+                self.confidence_threshold,
+                self.NMS_IOU_THRESHOLD,
+                classes=self.target_classes,
+                **nms_options
+            )
+        self._stream.synchronize()
+        
+        # Rows are [x1, y1, x2, y2, confidence, class], one copy per frame
+        detections = []
+        for output, transform in zip(outputs, transforms):
+            output = output.float().cpu().numpy()
+            detections.append(self._to_detections(
+                output[:, :4], output[:, 4], output[:, 5], transform
+            ))
+        return detections
+    
+    def _stream_context(self):
+        """Make the detector's CUDA stream current, if there is one"""
+        if self._stream is None:
+            return contextlib.nullcontext()
+        return torch.cuda.stream(self._stream)
+    
+    def _upload(self, frames: List[np.ndarray]) -> Tuple[Any, List[Tuple]]:
+        """Letterbox frames into the pinned buffer and copy them to the GPU"""
+        host = self._host_input.numpy()
+        transforms = [self._letterbox(frame, slot) for frame, slot in zip(frames, host)]
+        
+        n = len(frames)
+        device = self._device_input[:n]
+        device.copy_(self._host_input[:n], non_blocking=True)
+        
+        # BGR HWC uint8 -> RGB CHW in [0, 1] at the model's precision, the
+        # layout Ultralytics expects for tensor input
+        inputs = self._model_input[:n]
+        for c in range(3):
+            inputs[:, c].copy_(device[..., 2 - c])
+        return inputs.mul_(1 / 255), transforms
+    
+    def _letterbox(self, frame: np.ndarray, out: np.ndarray) -> Tuple:
+        """Resize frame into a padded square buffer, keeping its aspect ratio"""
+        h, w = frame.shape[:2]
+        r = min(self.INPUT_SIZE / h, self.INPUT_SIZE / w)
+        nw, nh = round(w * r), round(h * r)
+        left, top = (self.INPUT_SIZE - nw) // 2, (self.INPUT_SIZE - nh) // 2
+        
+        out[:top] = self.PAD_VALUE
+        out[top + nh:] = self.PAD_VALUE
+        out[top:top + nh, :left] = self.PAD_VALUE
+        out[top:top + nh, left + nw:] = self.PAD_VALUE
+        
+        # OpenCV resizes straight into the buffer when the target rows are
+        # contiguous (full-width, i.e. landscape frames); otherwise copy
+        target = out[top:top + nh, left:left + nw]
+        resized = cv2.resize(frame, (nw, nh), dst=target, interpolation=cv2.INTER_LINEAR)
+        if resized is not target:
+            target[:] = resized
+        return r, left, top, w, h
+    
+    def _parse_result(self, result: Any, transform: Optional[Tuple] = None) -> List[Detection]:
+        """Convert one YOLO result into person detections"""
+        # One device-to-host copy per tensor instead of one per box
+        boxes = result.boxes
+        return self._to_detections(
+            boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy(), boxes.cls.cpu().numpy(), transform
+        )
+    
+    def _to_detections(
+        self,
+        xyxy: np.ndarray,
+        conf: np.ndarray,
+        cls: np.ndarray,
+        transform: Optional[Tuple] = None
+    ) -> List[Detection]:
+        """Filter boxes to the target classes and build detections"""
+        cls = cls.astype(np.int32)
+        
+        # Map letterboxed coordinates back onto the original frame
+        if transform is not None:
+            r, left, top, w, h = transform
+            xyxy = np.clip((xyxy - (left, top, left, top)) / r, 0, (w, h, w, h))
+        
+        mask = (conf >= self.confidence_threshold) & np.isin(cls, self._target_classes_arr)
+        
+        return [
+            Detection(bbox=xyxy[i], confidence=float(conf[i]), class_id=int(cls[i]))
+            for i in np.flatnonzero(mask)
+        ]
     
     def _dummy_detect(self, frame: np.ndarray) -> List[Detection]:
         """Dummy detection for testing without YOLO"""
         # Generate random detections for testing
-        import random
-        detections = []
-        
         h, w = frame.shape[:2]
-        num_detections = random.randint(0, 5)
+        n = int(self._rng.integers(0, 6))
+        if n == 0:
+            return []
         
-        for _ in range(num_detections):
-            x1 = random.randint(0, w - 100)
-            y1 = random.randint(0, h - 200)
-            x2 = x1 + random.randint(50, 100)
-            y2 = y1 + random.randint(100, 200)
-            
-            detections.append(Detection(
-                bbox=np.array([x1, y1, x2, y2]),
-                confidence=random.uniform(0.5, 1.0),
-                class_id=0
-            ))
+        x1 = self._rng.integers(0, w - 99, size=n)
+        y1 = self._rng.integers(0, h - 199, size=n)
+        x2 = x1 + self._rng.integers(50, 101, size=n)
+        y2 = y1 + self._rng.integers(100, 201, size=n)
+        boxes = np.stack([x1, y1, x2, y2], axis=1).astype(np.float32)
+        confidences = self._rng.uniform(0.5, 1.0, size=n)
         
-        return detections
\ No newline at end of file
+        return [
+            Detection(bbox=boxes[i], confidence=float(confidences[i]), class_id=0)
+            for i in range(n)
+        ]
@@ -15,14 +15,16 @@ from src.api.routes import router, set_dependencies
 from src.utils.logger import setup_logger, logger
 from src.utils.helpers import load_config
 
+CONFIG_PATH = "config/config.yaml"
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifecycle"""
     logger.info("Starting Retail Analytics System...")
     
-    # Load configuration
-    config = load_config("config/config.yaml")
+    # Configuration read by create_app; missing file fails here, at startup
+    config = app.state.config if app.state.config is not None else load_config(CONFIG_PATH)
     
     # Initialize components
     camera_manager = CameraManager(config)
@@ -46,7 +48,12 @@ async def lifespan(app: FastAPI):
 
 def create_app() -> FastAPI:
     """Create and configure FastAPI application"""
-    setup_logger()
+    # Read the config once; importing the app must not require the file
+    try:
+        config = load_config(CONFIG_PATH)
+    except FileNotFoundError:
+        config = None
+    setup_logger((config or {}).get("system", {}).get("log_level", "INFO"))
     
     app = FastAPI(
         title="Retail Analytics API",
@@ -54,6 +61,7 @@ def create_app() -> FastAPI:
         version="1.0.0",
         lifespan=lifespan
     )
+    app.state.config = config
     
     # CORS middleware
     app.add_middleware(
@@ -77,7 +85,7 @@ app = create_app()
 
 
 if __name__ == "__main__":
-    config = load_config("config/config.yaml")
+    config = load_config(CONFIG_PATH)
     uvicorn.run(
         "src.main:app",
         host=config.get("api", {}).get("host", "0.0.0.0"),
@@ -5,21 +5,27 @@ from dataclasses import dataclass, field
 from collections import deque
 from scipy.optimize import linear_sum_assignment
 
+try:
+    from lap import lapjv
+    LAP_AVAILABLE = True
+except ImportError:
+    LAP_AVAILABLE = False
+
 from src.detection.person_detector import Detection
-from src.utils.helpers import calculate_iou
+from src.utils.helpers import box_iou_matrix
 from src.utils.logger import logger
 
 
-@dataclass
+@dataclass(slots=True)
 class Track:
-    """Tracked object"""
+    """Tracked object (snapshot returned by MultiObjectTracker.update)"""
     track_id: int
     bbox: np.ndarray
     confidence: float
     age: int = 0
     hits: int = 1
     time_since_update: int = 0
-    trail: List[Tuple[int, int]] = field(default_factory=list)
+    trail: deque = field(default_factory=lambda: deque(maxlen=50))
     
     @property
     def center(self) -> Tuple[int, int]:
@@ -27,28 +33,22 @@ class Track:
             int((self.bbox[0] + self.bbox[2]) / 2),
             int((self.bbox[1] + self.bbox[3]) / 2)
         )
-    
-    def update(self, detection: Detection):
-        """Update track with new detection"""
-        self.bbox = detection.bbox
-        self.confidence = detection.confidence
-        self.hits += 1
-        self.time_since_update = 0
-        self.age += 1
-        
-        # Update trail
-        self.trail.append(self.center)
-        if len(self.trail) > 50:  # Keep last 50 positions
-            self.trail.pop(0)
-    
-    def predict(self):
-        """Predict next position (simple linear prediction)"""
-        self.age += 1
-        self.time_since_update += 1
 
 
 class MultiObjectTracker:
-    """SORT-inspired multi-object tracker"""
+    """SORT-inspired multi-object tracker
+    
+    Track state is stored as parallel arrays (one row per track) so that
+    prediction, association and pruning are whole-array NumPy operations.
+    Trails are variable length and kept per track id.
+    
+    Each track also carries a per-frame velocity, measured between its last
+    two matched boxes, so that predict_only() can extrapolate positions on
+    frames where the detector is skipped.
+    """
+    
+    MAX_TRAIL = 50  # Keep last 50 positions
+    LAPJV_MIN_SIZE = 64  # Use lapjv (if installed) once both sides exceed this
     
     def __init__(self, config: Dict[str, Any]):
         self.config = config
@@ -56,88 +56,209 @@ class MultiObjectTracker:
         self.min_hits = config.get("min_hits", 3)
         self.iou_threshold = config.get("iou_threshold", 0.3)
         
-        self.tracks: List[Track] = []
         self.next_id = 1
         self.frame_count = 0
+        self._iou_buf = np.empty(0, dtype=np.float64)  # Reused IOU matrix storage
+        self._init_store()
+    
+    def _init_store(self):
+        """Allocate empty track arrays"""
+        self._ids = np.empty(0, dtype=np.int64)
+        self._bboxes = np.empty((0, 4), dtype=np.float64)
+        self._confidences = np.empty(0, dtype=np.float64)
+        self._age = np.empty(0, dtype=np.int64)
+        self._hits = np.empty(0, dtype=np.int64)
+        self._time_since_update = np.empty(0, dtype=np.int64)
+        self._velocity = np.empty((0, 4), dtype=np.float64)
+        self._trails: Dict[int, deque] = {}
     
     def update(self, detections: List[Detection]) -> List[Track]:
         """Update tracks with new detections"""
         self.frame_count += 1
         
         # Predict existing tracks
-        for track in self.tracks:
-            track.predict()
+        self._age += 1
+        self._time_since_update += 1
+        
+        if detections:
+            det_bboxes = np.stack([det.bbox for det in detections]).astype(np.float64)
+            det_confidences = np.array([det.confidence for det in detections], dtype=np.float64)
+        else:
+            det_bboxes = np.empty((0, 4), dtype=np.float64)
+            det_confidences = np.empty(0, dtype=np.float64)
         
         # Match detections to tracks
-        if len(self.tracks) > 0 and len(detections) > 0:
-            matched, unmatched_dets, unmatched_tracks = self._associate_detections(detections)
+        if len(self._ids) > 0 and len(detections) > 0:
+            matched, unmatched_dets, unmatched_tracks = self._associate_detections(det_bboxes)
             
             # Update matched tracks
-            for track_idx, det_idx in matched:
-                self.tracks[track_idx].update(detections[det_idx])
+            if matched:
+                track_idx, det_idx = (np.array(idx, dtype=np.intp) for idx in zip(*matched))
+                self._velocity[track_idx] = (
+                    (det_bboxes[det_idx] - self._bboxes[track_idx])
+                    / self._time_since_update[track_idx, None]
+                )
+                self._bboxes[track_idx] = det_bboxes[det_idx]
+                self._confidences[track_idx] = det_confidences[det_idx]
+                self._hits[track_idx] += 1
+                self._time_since_update[track_idx] = 0
+                self._age[track_idx] += 1
+                
+                for t in track_idx.tolist():
+                    self._append_trail(int(self._ids[t]), self._bboxes[t])
             
             # Create new tracks for unmatched detections
-            for det_idx in unmatched_dets:
-                self._create_track(detections[det_idx])
-        
-        elif len(detections) > 0:
+            new_idx = np.asarray(unmatched_dets, dtype=np.intp)
+        else:
             # No existing tracks, create new ones
-            for det in detections:
-                self._create_track(det)
+            new_idx = np.arange(len(detections))
         
-        # Remove dead tracks
-        self.tracks = [
-            t for t in self.tracks 
-            if t.time_since_update < self.max_age
-        ]
+        if len(new_idx) > 0:
+            self._create_tracks(det_bboxes[new_idx], det_confidences[new_idx])
+        
+        self._remove_dead_tracks()
         
         # Return confirmed tracks
-        return [t for t in self.tracks if t.hits >= self.min_hits]
+        return self._snapshot(self._hits >= self.min_hits)
     
-    def _associate_detections(self, detections: List[Detection]) -> Tuple[List, List, List]:
+    def predict_only(self) -> List[Track]:
+        """Advance tracks on a frame that was not run through the detector
+        
+        Tracks age as if nothing was detected; the returned boxes are the last
+        matched boxes moved along each track's velocity.
+        """
+        self.frame_count += 1
+        self._age += 1
+        self._time_since_update += 1
+        self._remove_dead_tracks()
+        
+        predicted = self._bboxes + self._velocity * self._time_since_update[:, None]
+        return self._snapshot(self._hits >= self.min_hits, predicted)
+    
+    def _remove_dead_tracks(self):
+        """Drop tracks that have gone unmatched for max_age frames"""
+        alive = self._time_since_update < self.max_age
+        if not alive.all():
+            for track_id in self._ids[~alive].tolist():
+                del self._trails[track_id]
+            self._keep(alive)
+    
+    def _associate_detections(self, det_bboxes: np.ndarray) -> Tuple[List, List, List]:
         """Associate detections with existing tracks using Hungarian algorithm"""
-        num_tracks = len(self.tracks)
-        num_dets = len(detections)
+        num_tracks = len(self._ids)
+        num_dets = len(det_bboxes)
         
-        # Compute IOU matrix
-        iou_matrix = np.zeros((num_tracks, num_dets))
+        # Compute IOU matrix into the reused buffer, growing it when needed.
+        # The view is C-contiguous float64, so the solvers use it without a copy
+        if self._iou_buf.size < num_tracks * num_dets:
+            self._iou_buf = np.empty(num_tracks * num_dets, dtype=np.float64)
+        iou_matrix = self._iou_buf[:num_tracks * num_dets].reshape(num_tracks, num_dets)
+        box_iou_matrix(self._bboxes, det_bboxes, out=iou_matrix)
         
-        for t, track in enumerate(self.tracks):
-            for d, det in enumerate(detections):
-                iou_matrix[t, d] = calculate_iou(track.bbox, det.bbox)
+        # Nothing overlaps enough: every track and detection is unmatched
+        candidates = iou_matrix >= self.iou_threshold
+        if not candidates.any():
+            return [], list(range(num_dets)), list(range(num_tracks))
         
-        # Use Hungarian algorithm (minimize cost = 1 - IOU)
-        cost_matrix = 1 - iou_matrix
-        track_indices, det_indices = linear_sum_assignment(cost_matrix)
+        if candidates.sum(axis=0).max() <= 1 and candidates.sum(axis=1).max() <= 1:
+            # No track or detection has two candidates, so every candidate
+            # pair is in the optimal assignment and no solver is needed
+            matched = list(zip(*(idx.tolist() for idx in np.nonzero(candidates))))
+        elif LAP_AVAILABLE and min(num_tracks, num_dets) > self.LAPJV_MIN_SIZE:
+            matched = self._lapjv_match(iou_matrix)
+        else:
+            # Use Hungarian algorithm (maximize total IOU)
+            track_indices, det_indices = linear_sum_assignment(iou_matrix, maximize=True)
+            good = iou_matrix[track_indices, det_indices] >= self.iou_threshold
+            matched = list(zip(track_indices[good].tolist(), det_indices[good].tolist()))
         
-        matched = []
-        unmatched_dets = list(range(num_dets))
-        unmatched_tracks = list(range(num_tracks))
+        matched_tracks = np.zeros(num_tracks, dtype=bool)
+        matched_dets = np.zeros(num_dets, dtype=bool)
+        if matched:
+            track_idx, det_idx = zip(*matched)
+            matched_tracks[list(track_idx)] = True
+            matched_dets[list(det_idx)] = True
         
-        for t, d in zip(track_indices, det_indices):
-            if iou_matrix[t, d] >= self.iou_threshold:
-                matched.append((t, d))
-                unmatched_dets.remove(d)
-                unmatched_tracks.remove(t)
+        unmatched_dets = np.flatnonzero(~matched_dets).tolist()
+        unmatched_tracks = np.flatnonzero(~matched_tracks).tolist()
         
         return matched, unmatched_dets, unmatched_tracks
     
-    def _create_track(self, detection: Detection) -> Track:
-        """Create a new track"""
-        track = Track(
-            track_id=self.next_id,
-            bbox=detection.bbox,
-            confidence=detection.confidence
-        )
-        track.trail.append(track.center)
+    def _lapjv_match(self, iou_matrix: np.ndarray) -> List[Tuple[int, int]]:
+        """Solve the assignment with lapjv, which is faster on large matrices"""
+        # Same objective as linear_sum_assignment, so both backends agree
+        _, track_to_det, _ = lapjv(1 - iou_matrix, extend_cost=True)
+        track_indices = np.flatnonzero(track_to_det >= 0)
+        det_indices = track_to_det[track_indices]
+        return [
+            (t, d) for t, d in zip(track_indices.tolist(), det_indices.tolist())
+            if iou_matrix[t, d] >= self.iou_threshold
+        ]
+    
+    def _create_tracks(self, bboxes: np.ndarray, confidences: np.ndarray):
+        """Append new tracks for the given detection boxes"""
+        n = len(bboxes)
+        ids = np.arange(self.next_id, self.next_id + n, dtype=np.int64)
+        self.next_id += n
         
-        self.tracks.append(track)
-        self.next_id += 1
+        self._ids = np.concatenate([self._ids, ids])
+        self._bboxes = np.concatenate([self._bboxes, bboxes])
+        self._confidences = np.concatenate([self._confidences, confidences])
+        self._age = np.concatenate([self._age, np.zeros(n, dtype=np.int64)])
+        self._hits = np.concatenate([self._hits, np.ones(n, dtype=np.int64)])
+        self._time_since_update = np.concatenate([self._time_since_update, np.zeros(n, dtype=np.int64)])
+        self._velocity = np.concatenate([self._velocity, np.zeros((n, 4))])
         
-        return track
+        for track_id, bbox in zip(ids.tolist(), bboxes):
+            self._trails[track_id] = deque(maxlen=self.MAX_TRAIL)
+            self._append_trail(track_id, bbox)
+    
+    def _append_trail(self, track_id: int, bbox: np.ndarray):
+        """Add a box center to a track's trail"""
+        self._trails[track_id].append(
+            (int((bbox[0] + bbox[2]) / 2), int((bbox[1] + bbox[3]) / 2))
+        )
+    
+    def _keep(self, mask: np.ndarray):
+        """Keep only the tracks selected by a boolean mask"""
+        self._ids = self._ids[mask]
+        self._bboxes = self._bboxes[mask]
+        self._confidences = self._confidences[mask]
+        self._age = self._age[mask]
+        self._hits = self._hits[mask]
+        self._time_since_update = self._time_since_update[mask]
+        self._velocity = self._velocity[mask]
+    
+    def _snapshot(self, mask: np.ndarray, bboxes: Optional[np.ndarray] = None) -> List[Track]:
+        """Build Track objects for the tracks selected by a boolean mask"""
+        bboxes = (self._bboxes if bboxes is None else bboxes)[mask]
+        return [
+            Track(
+                track_id=track_id,
+                bbox=bbox,
+                confidence=confidence,
+                age=age,
+                hits=hits,
+                time_since_update=time_since_update,
+                trail=self._trails[track_id]
+            )
+            for track_id, bbox, confidence, age, hits, time_since_update in zip(
+                self._ids[mask].tolist(),
+                bboxes,
+                self._confidences[mask].tolist(),
+                self._age[mask].tolist(),
+                self._hits[mask].tolist(),
+                self._time_since_update[mask].tolist()
+            )
+        ]
+    
+    @property
+    def tracks(self) -> List[Track]:
+        """All live tracks, confirmed or not"""
+        return self._snapshot(np.ones(len(self._ids), dtype=bool))
     
     def reset(self):
         """Reset tracker state"""
-        self.tracks = []
+        self._init_store()
         self.next_id = 1
         self.frame_count = 0
\ No newline at end of file
@@ -1,7 +1,7 @@
 """Helper utilities"""
 import yaml
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 import numpy as np
 
 
@@ -16,41 +16,101 @@ def load_config(config_path: str) -> Dict[str, Any]:
 
 
 def point_in_polygon(point: Tuple[int, int], polygon: List[List[int]]) -> bool:
-    """Check if a point is inside a polygon using ray casting"""
+    """Check if a point is inside a polygon using ray casting
+    
+    Same crossing rule as PolygonSet, as a plain loop: for a single point
+    that is cheaper than building edge arrays. Use PolygonSet for batches.
+    """
     x, y = point
-    n = len(polygon)
     inside = False
     
-    p1x, p1y = polygon[0]
-    for i in range(1, n + 1):
-        p2x, p2y = polygon[i % n]
-        if y > min(p1y, p2y):
-            if y <= max(p1y, p2y):
-                if x <= max(p1x, p2x):
-                    if p1y != p2y:
-                        xinters = (y - p1y) * (p2x - p1x) / (p2y - p1y) + p1x
-                    if p1x == p2x or x <= xinters:
-                        inside = not inside
-        p1x, p1y = p2x, p2y
+    x1, y1 = polygon[-1]
+    for x2, y2 in polygon:
+        if (y1 < y <= y2 or y2 < y <= y1) and x <= (y - y1) * (x2 - x1) / (y2 - y1) + x1:
+            inside = not inside
+        x1, y1 = x2, y2
     
     return inside
 
 
+class PolygonSet:
+    """Polygons with their edges flattened once for repeated point tests
+    
+    contains() runs even-odd ray casting of many points against every
+    polygon at once. An edge is crossed when min(y) < py <= max(y) and px
+    is at or left of the crossing point.
+    """
+    
+    def __init__(self, polygons: List[Any]):
+        polygons = [np.asarray(polygon, dtype=np.float64).reshape(-1, 2) for polygon in polygons]
+        self.size = len(polygons)
+        
+        # Edges of every polygon in contiguous arrays, grouped by polygon
+        starts = np.vstack(polygons) if polygons else np.empty((0, 2))
+        ends = np.vstack([np.roll(p, -1, axis=0) for p in polygons]) if polygons else np.empty((0, 2))
+        self._x1, self._y1 = starts[:, 0], starts[:, 1]
+        self._ymin = np.minimum(starts[:, 1], ends[:, 1])
+        self._ymax = np.maximum(starts[:, 1], ends[:, 1])
+        dy = ends[:, 1] - starts[:, 1]
+        self._slope = (ends[:, 0] - starts[:, 0]) / np.where(dy != 0, dy, 1.0)
+        self._offsets = np.cumsum([0] + [len(p) for p in polygons[:-1]]).astype(np.intp)
+    
+    def contains(self, points: Any) -> np.ndarray:
+        """(N, P) boolean array: whether each point lies in each polygon"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if self.size == 0:
+            return np.zeros((len(points), 0), dtype=bool)
+        
+        px, py = points[:, 0:1], points[:, 1:2]
+        straddles = (py > self._ymin) & (py <= self._ymax)
+        crossings = (straddles & (px <= (py - self._y1) * self._slope + self._x1)).astype(np.intp)
+        
+        return np.add.reduceat(crossings, self._offsets, axis=1) % 2 == 1
+
+
 def calculate_iou(box1: np.ndarray, box2: np.ndarray) -> float:
     """Calculate Intersection over Union between two boxes"""
-    x1 = max(box1[0], box2[0])
-    y1 = max(box1[1], box2[1])
-    x2 = min(box1[2], box2[2])
-    y2 = min(box1[3], box2[3])
+    # Plain floats avoid NumPy scalar dispatch on every min/max
+    ax1, ay1, ax2, ay2 = map(float, box1[:4])
+    bx1, by1, bx2, by2 = map(float, box2[:4])
     
-    intersection = max(0, x2 - x1) * max(0, y2 - y1)
+    intersection = max(0.0, min(ax2, bx2) - max(ax1, bx1)) * max(0.0, min(ay2, by2) - max(ay1, by1))
     
-    area1 = (box1[2] - box1[0]) * (box1[3] - box1[1])
-    area2 = (box2[2] - box2[0]) * (box2[3] - box2[1])
+    area1 = (ax2 - ax1) * (ay2 - ay1)
+    area2 = (bx2 - bx1) * (by2 - by1)
     
     union = area1 + area2 - intersection
     
-    return intersection / union if union > 0 else 0
+    return intersection / union if union > 0 else 0.0
+
+
+def box_iou_matrix(boxes: np.ndarray, query: np.ndarray,
+                   out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Pairwise IOU between (N, 4) and (M, 4) boxes, returned as (N, M)
+    
+    If given, ``out`` must be a float64 (N, M) array; the result is written
+    into it instead of a new array.
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    query = np.asarray(query, dtype=np.float64).reshape(-1, 4)
+    
+    x1 = np.maximum(boxes[:, None, 0], query[None, :, 0])
+    y1 = np.maximum(boxes[:, None, 1], query[None, :, 1])
+    x2 = np.minimum(boxes[:, None, 2], query[None, :, 2])
+    y2 = np.minimum(boxes[:, None, 3], query[None, :, 3])
+    
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    
+    area_b = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    area_q = (query[:, 2] - query[:, 0]) * (query[:, 3] - query[:, 1])
+    
+    union = area_b[:, None] + area_q[None, :] - intersection
+    
+    if out is None:
+        out = np.empty(intersection.shape, dtype=np.float64)
+    out.fill(0.0)
+    np.divide(intersection, union, out=out, where=union > 0)
+    return out
 
 
 def get_center(bbox: np.ndarray) -> Tuple[int, int]:
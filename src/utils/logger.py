@@ -3,15 +3,19 @@ import sys
 from loguru import logger
 
 
-def setup_logger():
-    """Configure loguru logger"""
+def setup_logger(level: str = "INFO"):
+    """Configure loguru logger
+    
+    The file sink is written from loguru's background thread (enqueue=True)
+    so slow disk I/O never blocks the capture or inference threads.
+    """
     logger.remove()
     
     # Console output
     logger.add(
         sys.stdout,
         format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
-        level="DEBUG",
+        level=level,
         colorize=True
     )
     
@@ -20,7 +24,8 @@ def setup_logger():
         "logs/retail_analytics_{time}.log",
         rotation="100 MB",
         retention="7 days",
-        level="INFO"
+        level="INFO",
+        enqueue=True
     )
     
     return logger
\ No newline at end of file
@@ -0,0 +1,59 @@
+"""Tests for the camera pipeline"""
+import asyncio
+
+import numpy as np
+
+from src.camera.camera_manager import CameraManager, CameraProcessor
+from src.detection import person_detector
+from src.detection.person_detector import PersonDetector
+
+
+def _item(tag, detections):
+    return np.array([tag]), detections
+
+
+def _tags(queue):
+    items = [queue.get_nowait() for _ in range(queue.qsize())]
+    return [(int(frame[0]), detections is None) for frame, detections in items]
+
+
+def test_skipped_frames_never_evict_detection_results():
+    queue = asyncio.Queue(maxsize=2)
+    CameraManager._put_result(queue, _item(1, []))
+    CameraManager._put_result(queue, _item(2, []))
+
+    # A full queue of results drops the skipped frame itself
+    CameraManager._put_result(queue, _item(3, None))
+    assert _tags(queue) == [(1, False), (2, False)]
+
+
+def test_detection_results_evict_skipped_frames_first():
+    queue = asyncio.Queue(maxsize=3)
+    CameraManager._put_result(queue, _item(1, []))
+    CameraManager._put_result(queue, _item(2, None))
+    CameraManager._put_result(queue, _item(3, []))
+
+    CameraManager._put_result(queue, _item(4, []))
+    assert _tags(queue) == [(1, False), (3, False), (4, False)]
+
+    # Only results left: the oldest one goes
+    for item in [_item(1, []), _item(3, []), _item(4, [])]:
+        queue.put_nowait(item)
+    CameraManager._put_result(queue, _item(5, []))
+    assert _tags(queue) == [(3, False), (4, False), (5, False)]
+
+
+def test_detection_schedule(monkeypatch):
+    monkeypatch.setattr(person_detector, "YOLO_AVAILABLE", False)
+    processor = CameraProcessor(
+        {"id": "cam", "name": "cam", "source": "unused.mp4"}, PersonDetector({}), {}, detect_every_n_frames=3
+    )
+
+    schedule = []
+    for _ in range(7):
+        # Reading the schedule does not advance it
+        assert processor.detects_next_frame == processor.detects_next_frame
+        schedule.append(processor.detects_next_frame)
+        processor.advance_frame()
+
+    assert schedule == [True, False, False, True, False, False, True]
@@ -0,0 +1,109 @@
+"""Tests for the person detector's pre- and post-processing"""
+import numpy as np
+import pytest
+
+from src.detection import person_detector
+from src.detection.person_detector import PersonDetector
+
+
+@pytest.fixture
+def detector(monkeypatch):
+    # Exercise the CPU-side code without loading model weights
+    monkeypatch.setattr(person_detector, "YOLO_AVAILABLE", False)
+    return PersonDetector({"confidence_threshold": 0.5, "classes": [0], "max_batch": 4})
+
+
+def test_dummy_detections_fit_the_frame(detector):
+    frames = [np.zeros((720, 1280, 3), dtype=np.uint8)] * 50
+    batches = detector.detect_batch(frames)
+    assert len(batches) == 50
+    assert any(batches)
+    for detections in batches:
+        assert len(detections) <= 5
+        for det in detections:
+            x1, y1, x2, y2 = det.bbox
+            assert 0 <= x1 < x2 <= 1280
+            assert 0 <= y1 < y2 <= 720
+            assert 0.5 <= det.confidence <= 1.0
+            assert det.class_id == 0
+
+
+@pytest.mark.parametrize("shape", [(720, 1280), (1080, 1920), (480, 640), (1280, 720)])
+def test_letterbox_keeps_aspect_and_pads(detector, shape):
+    h, w = shape
+    frame = np.full((h, w, 3), 7, dtype=np.uint8)
+    out = np.empty((detector.INPUT_SIZE, detector.INPUT_SIZE, 3), dtype=np.uint8)
+
+    r, left, top, ow, oh = detector._letterbox(frame, out)
+
+    assert (ow, oh) == (w, h)
+    nw, nh = round(w * r), round(h * r)
+    assert max(nw, nh) == detector.INPUT_SIZE
+    assert (out[top:top + nh, left:left + nw] == 7).all()
+    assert (out == 7).sum() == nw * nh * 3
+    assert (out == detector.PAD_VALUE).sum() == out.size - nw * nh * 3
+
+
+class _FakeTensor:
+    def __init__(self, array):
+        self._array = np.asarray(array)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self._array
+
+
+def _fake_result(xyxy, conf, cls):
+    boxes = type("Boxes", (), {})()
+    boxes.xyxy, boxes.conf, boxes.cls = _FakeTensor(xyxy), _FakeTensor(conf), _FakeTensor(cls)
+    result = type("Result", (), {})()
+    result.boxes = boxes
+    return result
+
+
+def test_parse_result_maps_boxes_back_and_filters(detector):
+    frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+    out = np.empty((detector.INPUT_SIZE, detector.INPUT_SIZE, 3), dtype=np.uint8)
+    transform = detector._letterbox(frame, out)
+    r, left, top, _, _ = transform
+
+    boxes = np.array([[100, 200, 160, 350], [0, 0, 1280, 720], [500, 300, 560, 450]], dtype=np.float32)
+    letterboxed = boxes * r + (left, top, left, top)
+    result = _fake_result(letterboxed, [0.9, 0.8, 0.3], [0, 0, 0])
+
+    detections = detector._parse_result(result, transform)
+
+    # The low-confidence box is dropped
+    assert len(detections) == 2
+    np.testing.assert_allclose(detections[0].bbox, boxes[0], atol=1e-3)
+    np.testing.assert_allclose(detections[1].bbox, boxes[1], atol=1e-3)
+
+
+def test_parse_result_drops_other_classes(detector):
+    result = _fake_result([[0, 0, 10, 10], [5, 5, 20, 20]], [0.9, 0.9], [0, 2])
+    detections = detector._parse_result(result)
+    assert [det.class_id for det in detections] == [0]
+
+
+def test_direct_inference_failure_falls_back_to_predict(detector):
+    calls = []
+
+    def model(frames, **kwargs):
+        calls.append(len(frames))
+        return [_fake_result([[10, 20, 60, 170]], [0.9], [0]) for _ in frames]
+
+    def broken_backend(inputs):
+        raise RuntimeError("unsupported backend")
+
+    detector.model = model
+    detector._backend = broken_backend
+    frames = [np.zeros((720, 1280, 3), dtype=np.uint8)] * 6
+
+    # The failing chunk is retried through predict(), and so is every later one
+    results = detector.detect_batch(frames)
+    assert detector._backend is None
+    assert calls == [4, 2]
+    assert [len(detections) for detections in results] == [1] * 6
+    np.testing.assert_allclose(results[0][0].bbox, [10, 20, 60, 170])
@@ -0,0 +1,71 @@
+"""Tests for the traffic heatmap"""
+import numpy as np
+import pytest
+
+from src.analytics.heatmap import HeatmapGenerator
+from src.tracking.tracker import Track
+
+
+def _track(track_id, cx, cy):
+    return Track(
+        track_id=track_id,
+        bbox=np.array([cx - 50, cy - 100, cx + 50, cy + 100], dtype=np.float64),
+        confidence=0.9,
+    )
+
+
+def test_peak_after_one_update():
+    heatmap = HeatmapGenerator({"width": 1280, "height": 720})
+    heatmap.update([_track(1, 640, 360)])
+
+    data = heatmap.get_heatmap_data()
+    assert data.shape == (720, 1280)
+    assert data.max() == pytest.approx(1.0, abs=0.01)
+    assert abs(data.argmax() // 1280 - 360) <= heatmap.scale
+    assert abs(data.argmax() % 1280 - 640) <= heatmap.scale
+    assert data[0, 0] == 0.0
+
+
+def test_edge_tracks_stay_in_bounds():
+    heatmap = HeatmapGenerator({"width": 1280, "height": 720})
+    heatmap.update([_track(1, 0, 0), _track(2, 1279, 719), _track(3, 5000, 360)])
+
+    data = heatmap.get_heatmap_data()
+    assert data[0, 0] == pytest.approx(1.0, abs=0.01)
+    assert data[719, 1279] == pytest.approx(1.0, abs=0.01)
+    assert data.max() <= 1.0 + 1e-6
+
+
+@pytest.mark.parametrize("read_while_present", [True, False])
+@pytest.mark.parametrize("jitter", [0, 8, 20])
+def test_fades_soon_after_a_long_stay(jitter, read_while_present):
+    # Heat is clamped as impulses are folded in, on read or every few
+    # frames, so a spot that was occupied for a long time starts fading as
+    # soon as the person leaves
+    rng = np.random.default_rng(0)
+    heatmap = HeatmapGenerator({"width": 1280, "height": 720})
+    for _ in range(300):
+        dx, dy = rng.integers(-jitter, jitter + 1, 2) if jitter else (0, 0)
+        heatmap.update([_track(1, 640 + dx, 360 + dy)])
+        if read_while_present:
+            assert heatmap.get_heatmap_data().max() <= 1.0 + 1e-6
+
+    frames = 0
+    while heatmap.get_heatmap_data()[360, 640] >= 0.99:
+        heatmap.update([])
+        frames += 1
+        assert frames <= 3
+
+    # And keeps decaying geometrically from there
+    before = heatmap.get_heatmap_data()[360, 640]
+    for _ in range(100):
+        heatmap.update([])
+    after = heatmap.get_heatmap_data()[360, 640]
+    assert after == pytest.approx(before * heatmap.decay ** 100, rel=1e-3)
+
+
+def test_reset():
+    heatmap = HeatmapGenerator({"width": 640, "height": 480})
+    heatmap.update([_track(1, 320, 240)])
+    heatmap.reset()
+    assert not heatmap.get_heatmap_data().any()
@@ -0,0 +1,29 @@
+"""Tests for helper utilities"""
+import numpy as np
+
+from src.utils.helpers import box_iou_matrix, calculate_iou
+
+
+def _random_boxes(rng, n):
+    corners = rng.uniform(0, 200, (n, 2))
+    sizes = rng.uniform(0, 100, (n, 2))
+    return np.hstack([corners, corners + sizes])
+
+
+def test_calculate_iou_matches_box_iou_matrix():
+    rng = np.random.default_rng(0)
+    boxes, query = _random_boxes(rng, 40), _random_boxes(rng, 30)
+
+    expected = box_iou_matrix(boxes, query)
+    for i, box in enumerate(boxes):
+        for j, other in enumerate(query):
+            assert abs(calculate_iou(box, other) - expected[i, j]) < 1e-12
+
+
+def test_calculate_iou_edge_cases():
+    box = np.array([0.0, 0.0, 10.0, 10.0])
+    assert calculate_iou(box, box) == 1.0
+    assert calculate_iou(box, np.array([10.0, 0.0, 20.0, 10.0])) == 0.0  # Touching edges
+    assert calculate_iou(box, np.array([0.0, 0.0, 5.0, 10.0])) == 0.5
+    assert calculate_iou(np.zeros(4), np.zeros(4)) == 0.0  # Degenerate boxes
+    assert isinstance(calculate_iou([0, 0, 2, 2], [1, 1, 3, 3]), float)
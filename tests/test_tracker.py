@@ -0,0 +1,233 @@
+"""Tests for the multi-object tracker"""
+import numpy as np
+import pytest
+from scipy.optimize import linear_sum_assignment
+
+from src.detection.person_detector import Detection
+from src.tracking import tracker as tracker_module
+from src.tracking.tracker import MultiObjectTracker
+
+
+def _iou(a, b):
+    """Scalar IOU as computed by the original per-pair tracker"""
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    if x2 < x1 or y2 < y1:
+        return 0.0
+    inter = (x2 - x1) * (y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+class ReferenceTracker:
+    """The original list-of-tracks SORT loop, kept as an oracle"""
+
+    def __init__(self, max_age=30, min_hits=3, iou_threshold=0.3):
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.iou_threshold = iou_threshold
+        self.tracks = []
+        self.next_id = 1
+
+    def _create(self, det):
+        bbox = det.bbox
+        center = (int((bbox[0] + bbox[2]) / 2), int((bbox[1] + bbox[3]) / 2))
+        self.tracks.append({
+            "track_id": self.next_id, "bbox": bbox, "confidence": det.confidence,
+            "age": 0, "hits": 1, "time_since_update": 0, "trail": [center],
+        })
+        self.next_id += 1
+
+    def update(self, detections):
+        for t in self.tracks:
+            t["age"] += 1
+            t["time_since_update"] += 1
+
+        if self.tracks and detections:
+            iou = np.array([[_iou(t["bbox"], d.bbox) for d in detections] for t in self.tracks])
+            unmatched = set(range(len(detections)))
+            for ti, di in zip(*linear_sum_assignment(1 - iou)):
+                if iou[ti, di] >= self.iou_threshold:
+                    t, det = self.tracks[ti], detections[di]
+                    t["bbox"] = det.bbox
+                    t["confidence"] = det.confidence
+                    t["hits"] += 1
+                    t["time_since_update"] = 0
+                    t["age"] += 1
+                    b = det.bbox
+                    t["trail"] = (t["trail"] + [(int((b[0] + b[2]) / 2), int((b[1] + b[3]) / 2))])[-50:]
+                    unmatched.discard(di)
+            for di in sorted(unmatched):
+                self._create(detections[di])
+        else:
+            for det in detections:
+                self._create(det)
+
+        self.tracks = [t for t in self.tracks if t["time_since_update"] < self.max_age]
+        return [t for t in self.tracks if t["hits"] >= self.min_hits]
+
+
+def _scene_stream(rng, frames=200, people=8):
+    """Detections for well-separated people walking around, with dropouts"""
+    # One person per 250x250 cell so that boxes never overlap
+    cells = np.stack(np.meshgrid(np.arange(4), np.arange(2)), axis=-1).reshape(-1, 2)[:people]
+    origins = cells * 250.0
+    offsets = rng.uniform(20, 60, (people, 2))
+    for _ in range(frames):
+        offsets = np.clip(offsets + rng.normal(0, 3, offsets.shape), 0, 100)
+        # Occasionally someone jumps to another spot in their cell
+        if rng.random() < 0.05:
+            offsets[rng.integers(people)] = rng.uniform(0, 100, 2)
+        corners = origins + offsets
+        visible = rng.random(people) < 0.8
+        if rng.random() < 0.05:
+            visible[:] = False
+        yield [
+            Detection(
+                bbox=np.array([x, y, x + 60, y + 150]),
+                confidence=float(rng.uniform(0.5, 1.0)),
+                class_id=0,
+            )
+            for (x, y), v in zip(corners, visible) if v
+        ]
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_matches_reference_tracker(seed):
+    rng = np.random.default_rng(seed)
+    reference = ReferenceTracker()
+    tracker = MultiObjectTracker({})
+
+    for frame, detections in enumerate(_scene_stream(rng)):
+        # Long gaps so that tracks expire and ids keep advancing
+        if frame % 60 == 59:
+            for _ in range(31):
+                reference.update([])
+                tracker.update([])
+
+        expected = reference.update(detections)
+        actual = tracker.update(detections)
+
+        assert [t.track_id for t in actual] == [t["track_id"] for t in expected]
+        for got, want in zip(actual, expected):
+            np.testing.assert_allclose(got.bbox, want["bbox"])
+            assert got.confidence == want["confidence"]
+            assert got.age == want["age"]
+            assert got.hits == want["hits"]
+            assert got.time_since_update == want["time_since_update"]
+            assert list(got.trail) == want["trail"]
+
+    assert tracker.next_id == reference.next_id
+
+
+def _detections(boxes):
+    return [Detection(bbox=np.asarray(b, dtype=np.float64), confidence=0.9, class_id=0) for b in boxes]
+
+
+def _person(x1):
+    return [x1, 0.0, x1 + 100.0, 200.0]
+
+
+def _spy_solvers(monkeypatch):
+    """Record which assignment solvers the tracker calls"""
+    calls = []
+    for name in ("linear_sum_assignment", "lapjv"):
+        solver = getattr(tracker_module, name, None)
+        if solver is not None:
+            monkeypatch.setattr(
+                tracker_module, name,
+                lambda *args, _name=name, _solver=solver, **kwargs: calls.append(_name) or _solver(*args, **kwargs)
+            )
+    return calls
+
+
+def test_crossing_people_keep_both_matches(monkeypatch):
+    # IOU matrix [[.481, .042], [.681, .449]]: the best single pair (1, 0)
+    # would leave track 0 unmatched, the optimal assignment matches both
+    tracker = MultiObjectTracker({"min_hits": 1})
+    first = tracker.update(_detections([_person(33), _person(87)]))
+    calls = _spy_solvers(monkeypatch)
+
+    tracks = tracker.update(_detections([_person(68), _person(125)]))
+
+    assert calls == ["linear_sum_assignment"]
+    assert [t.track_id for t in tracks] == [t.track_id for t in first]
+    assert [t.bbox[0] for t in tracks] == [68.0, 125.0]
+    assert tracker.next_id == 3
+
+
+def _grid_boxes(rows, cols, spacing):
+    x, y = np.meshgrid(np.arange(cols) * spacing, np.arange(rows) * spacing)
+    corners = np.stack([x.ravel(), y.ravel()], axis=1)
+    return np.hstack([corners, corners + 50])
+
+
+@pytest.mark.parametrize("rows, cols, spacing, solver", [
+    (4, 5, 100.0, None),                     # No box overlaps another: no solver
+    (4, 5, 20.0, "linear_sum_assignment"),   # Neighbours overlap: full assignment
+    (9, 9, 20.0, "lapjv"),                   # Large and overlapping: lapjv
+])
+def test_association_paths_keep_identities(monkeypatch, rows, cols, spacing, solver):
+    if solver == "lapjv" and not tracker_module.LAP_AVAILABLE:
+        pytest.skip("lap is not installed")
+
+    rng = np.random.default_rng(0)
+    tracker = MultiObjectTracker({"min_hits": 1})
+
+    boxes = _grid_boxes(rows, cols, spacing)
+    ids = [t.track_id for t in tracker.update(_detections(boxes))]
+    calls = _spy_solvers(monkeypatch)
+
+    # Shuffle the detection order; every track must follow its own box
+    moved = boxes + rng.normal(0, 1, boxes.shape)
+    order = rng.permutation(len(moved))
+    tracks = tracker.update(_detections(moved[order]))
+
+    assert calls == ([solver] if solver else [])
+    assert len(tracks) == len(ids)
+    by_id = {t.track_id: t.bbox for t in tracks}
+    for track_id, box in zip(ids, moved):
+        np.testing.assert_allclose(by_id[track_id], box)
+
+
+@pytest.mark.skipif(not tracker_module.LAP_AVAILABLE, reason="lap is not installed")
+@pytest.mark.parametrize("shape", [(70, 70), (80, 100), (100, 75)])
+def test_lapjv_matches_linear_sum_assignment(shape):
+    rng = np.random.default_rng(sum(shape))
+    tracker = MultiObjectTracker({})
+
+    # Sparse overlaps, as between nearby boxes, with values around the threshold
+    iou_matrix = np.where(rng.random(shape) < 0.05, rng.uniform(0, 1, shape), 0.0)
+
+    lapjv_pairs = tracker._lapjv_match(iou_matrix)
+    rows, cols = linear_sum_assignment(iou_matrix, maximize=True)
+    good = iou_matrix[rows, cols] >= tracker.iou_threshold
+
+    expected_total = iou_matrix[rows[good], cols[good]].sum()
+    assert sum(iou_matrix[t, d] for t, d in lapjv_pairs) == pytest.approx(expected_total)
+    assert all(iou_matrix[t, d] >= tracker.iou_threshold for t, d in lapjv_pairs)
+    assert len({t for t, _ in lapjv_pairs}) == len({d for _, d in lapjv_pairs}) == len(lapjv_pairs)
+
+
+def test_predict_only_extrapolates_velocity():
+    tracker = MultiObjectTracker({"min_hits": 1})
+    tracker.update([Detection(bbox=np.array([0.0, 0.0, 50.0, 100.0]), confidence=0.9, class_id=0)])
+    tracker.update([Detection(bbox=np.array([10.0, 0.0, 60.0, 100.0]), confidence=0.9, class_id=0)])
+
+    predicted = tracker.predict_only()
+    np.testing.assert_allclose(predicted[0].bbox, [20.0, 0.0, 70.0, 100.0])
+    assert predicted[0].time_since_update == 1
+
+    # Velocity is measured over the skipped frames on the next match
+    tracker.predict_only()
+    tracker.update([Detection(bbox=np.array([40.0, 0.0, 90.0, 100.0]), confidence=0.9, class_id=0)])
+    np.testing.assert_allclose(tracker.predict_only()[0].bbox, [50.0, 0.0, 100.0, 100.0])
+
+
+def test_tracks_expire_after_max_age():
+    tracker = MultiObjectTracker({"max_age": 3, "min_hits": 1})
+    tracker.update([Detection(bbox=np.array([0.0, 0.0, 50.0, 100.0]), confidence=0.9, class_id=0)])
+
+    assert len(tracker.update([])) == 1
+    assert len(tracker.update([])) == 1
+    assert tracker.update([]) == []
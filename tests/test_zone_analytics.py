@@ -0,0 +1,98 @@
+"""Tests for zone analytics"""
+import numpy as np
+import pytest
+
+from src.analytics.zone_analytics import ZoneAnalytics
+from src.tracking.tracker import Track
+from src.utils.helpers import point_in_polygon
+
+
+ZONES = [
+    {"name": "entrance", "points": [[0, 0], [400, 0], [400, 300], [0, 300]]},
+    {"name": "checkout", "points": [[300, 200], [700, 150], [650, 600], [350, 500]]},
+    # Concave, with a horizontal and a vertical edge
+    {"name": "aisle", "points": [[800, 100], [1200, 100], [1200, 600], [1000, 350], [800, 600]]},
+]
+
+
+def _track(track_id, cx, cy):
+    return Track(
+        track_id=track_id,
+        bbox=np.array([cx - 50, cy - 100, cx + 50, cy + 100], dtype=np.float64),
+        confidence=0.9,
+    )
+
+
+def test_zone_counts_and_exits():
+    analytics = ZoneAnalytics(ZONES)
+
+    analytics.update([_track(1, 100, 100), _track(2, 500, 350), _track(3, 1000, 500)])
+    stats = analytics.get_stats()
+    assert stats["entrance"]["current_count"] == 1
+    assert stats["checkout"]["current_count"] == 1
+    assert stats["aisle"]["current_count"] == 0  # Inside the notch
+
+    analytics.update([_track(2, 500, 350)])
+    stats = analytics.get_stats()
+    assert stats["entrance"]["current_count"] == 0
+    assert stats["entrance"]["total_exits"] == 1
+    assert stats["checkout"]["total_entries"] == 1
+
+
+def test_overlapping_zones_pick_the_first():
+    analytics = ZoneAnalytics(ZONES)
+
+    # (350, 250) lies in both the entrance and the checkout
+    assert analytics.get_zones_for_points([(350, 250), (100, 100), (2000, 2000)]) == [
+        "entrance", "entrance", None
+    ]
+    assert analytics.get_zone_for_point((500, 350)) == "checkout"
+    assert ZoneAnalytics([]).get_zones_for_points([(1, 1)]) == [None]
+
+
+def _ray_cast(point, polygon):
+    """The original scalar ray casting test, kept as an oracle"""
+    x, y = point
+    n = len(polygon)
+    inside = False
+
+    p1x, p1y = polygon[0]
+    for i in range(1, n + 1):
+        p2x, p2y = polygon[i % n]
+        if y > min(p1y, p2y):
+            if y <= max(p1y, p2y):
+                if x <= max(p1x, p2x):
+                    if p1y != p2y:
+                        xinters = (y - p1y) * (p2x - p1x) / (p2y - p1y) + p1x
+                    if p1x == p2x or x <= xinters:
+                        inside = not inside
+        p1x, p1y = p2x, p2y
+
+    return inside
+
+
+def _random_points(seed):
+    rng = np.random.default_rng(seed)
+    # Random points plus every vertex, where edge handling matters most
+    points = [tuple(p) for p in rng.integers(-50, 1300, (2000, 2)).tolist()]
+    return points + [tuple(v) for zone in ZONES for v in zone["points"]]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_classify_points_matches_ray_cast(seed):
+    analytics = ZoneAnalytics(ZONES)
+    points = _random_points(seed)
+
+    expected = []
+    for point in points:
+        hits = [i for i, zone in enumerate(ZONES) if _ray_cast(point, zone["points"])]
+        expected.append(hits[0] if hits else len(ZONES))
+
+    np.testing.assert_array_equal(analytics._classify_points(points), expected)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_point_in_polygon_matches_ray_cast(seed):
+    for point in _random_points(seed):
+        for zone in ZONES:
+            assert point_in_polygon(point, zone["points"]) == _ray_cast(point, zone["points"])